@@ -1,40 +1,121 @@
-import psycopg2
-from psycopg2 import extras # Used for DictCursor
-from datetime import datetime # For precise timestamp formatting in output
+import sys
+from itertools import islice # For writing streamed rows in chunks
+import psycopg
+from psycopg import errors # Used to tell stored-function validation errors apart
+from psycopg.rows import namedtuple_row # Used to access results by column name
+from psycopg_pool import AsyncConnectionPool, ConnectionPool # Connections are checked out per operation
+from uuid import uuid4 # For unique server-side cursor names
+
+def _merge_cart(products_with_quantities):
+    """
+    Validates a cart client-side, before any database round-trip: every quantity must be positive
+    and the cart must not be empty. Repeated product IDs are merged into a single line.
+    Returns two parallel lists `(product_ids, quantities)`; raises ValueError on an invalid cart.
+    """
+    items = {}
+    for product_id, quantity in products_with_quantities:
+        if quantity <= 0:
+            raise ValueError(f"Quantity for product ID {product_id} must be positive, got {quantity}.")
+        items[product_id] = items.get(product_id, 0) + quantity
+    if not items:
+        raise ValueError("An order must contain at least one product.")
+    return list(items), list(items.values())
+
+def _format_order_date(order_date):
+    """Formats an orders.order_date value for display. The column is nullable, so None prints as 'N/A'."""
+    return f"{order_date:%Y-%m-%d %H:%M:%S}" if order_date is not None else "N/A"
 
 class ECommerceManager:
-    def __init__(self, dbname, user, password, host="localhost", port="5432"):
-        self.conn_params = {
+    # True when the schema created by _initialize_database already exists.
+    # Update it whenever the DDL adds or changes an object.
+    _schema_check_sql = """
+    SELECT to_regclass('customers') IS NOT NULL
+       AND to_regclass('order_items') IS NOT NULL
+       AND to_regclass('customer_order_details') IS NOT NULL
+       AND to_regclass('top_selling_products') IS NOT NULL
+       AND to_regclass('idx_top_selling_products_quantity') IS NOT NULL
+       AND to_regclass('idx_order_items_product_id_q') IS NOT NULL
+       AND to_regclass('idx_orders_active') IS NOT NULL
+       AND to_regprocedure('create_order(integer, integer[], integer[])') IS NOT NULL AS schema_ready;
+    """
+
+    # Statements and settings below are shared with AsyncECommerceManager.
+    # Per-connection settings on top of conn_params; see _connect for what each one does.
+    _connection_settings = {"autocommit": True, "prepare_threshold": 1, "row_factory": namedtuple_row}
+    _add_customer_sql = "INSERT INTO customers (first_name, last_name, email, phone) VALUES (%s, %s, %s, %s) RETURNING customer_id;"
+    _copy_customers_sql = "COPY customers (first_name, last_name, email, phone) FROM STDIN;"
+    _create_order_sql = "SELECT new_order_id, order_total FROM create_order(%s, %s::int[], %s::int[]);"
+    _order_history_sql = "SELECT * FROM customer_order_details WHERE customer_id = %s ORDER BY order_date DESC, order_id, product_name;"
+    # Formatted with (row, formatted order_date)
+    _order_history_line = ("  Order ID: {0.order_id}, Date: {1}, "
+                           "Product: {0.product_name}, Qty: {0.quantity}, Unit Price: {0.price_at_purchase:.2f}, "
+                           "Order Total: {0.total_amount:.2f}, Status: {0.status}\n")
+
+    _refresh_views_sql = "REFRESH MATERIALIZED VIEW CONCURRENTLY top_selling_products;"
+
+    def __init__(self, dbname, user, password, host="localhost", port="5432", min_connections=2, max_connections=16):
+        self.conn_params = self._conn_params(dbname, user, password, host, port)
+        self.pool = None
+        self._connect(min_connections, max_connections)
+        self._initialize_database()
+
+    @staticmethod
+    def _conn_params(dbname, user, password, host, port):
+        """Builds the libpq connection parameters used by both manager classes."""
+        return {
             "dbname": dbname,
             "user": user,
             "password": password,
             "host": host,
-            "port": port
+            "port": port,
+            # Hide notices such as "relation already exists, skipping" for every session
+            "options": "-c client_min_messages=warning"
         }
-        self.conn = None
-        self.cursor = None
-        self._connect()
-        self._initialize_database()
 
-    def _connect(self):
-        """Connects to the PostgreSQL database."""
+    @classmethod
+    def _format_order_history_line(cls, row):
+        """Formats one customer_order_details row as a line of order history output."""
+        return cls._order_history_line.format(row, _format_order_date(row.order_date))
+
+    def _connect(self, min_connections, max_connections):
+        """Opens a pool of connections to the PostgreSQL database."""
+        # Use namedtuple_row to access results by column name (row.column); the row class is built
+        # once per result shape, so each row is a compact tuple rather than a dict.
+        # prepare_threshold=1: statements executed more than once are prepared server-side,
+        # so repeated calls skip the parse/plan step.
+        # autocommit: each statement commits on its own, without separate BEGIN/COMMIT round-trips
+        # or a snapshot held open after reads; multi-statement work uses an explicit transaction().
+        self.pool = ConnectionPool(
+            kwargs={**self.conn_params, **self._connection_settings},
+            min_size=min_connections,
+            max_size=max_connections,
+            open=False,
+        )
         try:
-            self.conn = psycopg2.connect(**self.conn_params)
-            # Use DictCursor to access results by column name
-            self.cursor = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            # Probe with one direct connection first: an unreachable or misconfigured database fails here
+            # immediately with libpq's own error, instead of the pool retrying until its open timeout
+            psycopg.connect(**self.conn_params).close()
+            self.pool.open(wait=True)
             print("Successfully connected to PostgreSQL database.")
-        except psycopg2.Error as e:
+        except psycopg.Error as e:
             print(f"Database connection error: {e}")
+            self.pool.close()
             raise # Re-raise the exception to indicate connection failure
 
     def _initialize_database(self):
-        """Initializes the database: creates tables, views, and indexes if they don't exist."""
+        """
+        Initializes the database: creates tables, views, indexes, and functions if they don't exist.
+        The DDL is skipped entirely when the schema is already in place, so short-lived processes
+        start quickly and don't take DDL locks; `_schema_check_sql` names the newest objects it expects.
+        """
         try:
+            with self.pool.connection() as conn:
+                if conn.execute(self._schema_check_sql).fetchone().schema_ready:
+                    print("Database schema already initialized.")
+                    return
+
             # All DDL (Data Definition Language) SQL statements
             ddl_sql = """
-            -- Disable notice for 'CREATE TABLE IF NOT EXISTS' for cleaner output during initialization
-            SET client_min_messages TO WARNING;
-
             -- 1. Create Customers Table
             CREATE TABLE IF NOT EXISTS customers (
                 customer_id SERIAL PRIMARY KEY,
@@ -78,6 +159,7 @@ class ECommerceManager:
             ---
 
             -- 5. Create Views
+            -- A plain view: per-customer lookups go through idx_orders_customer_id and always see the latest orders
             CREATE OR REPLACE VIEW customer_order_details AS
             SELECT
                 c.customer_id,
@@ -97,58 +179,141 @@ class ECommerceManager:
             JOIN
                 order_items oi ON o.order_id = oi.order_id
             JOIN
-                products p ON oi.product_id = p.product_id
-            ORDER BY
-                o.order_date DESC, o.order_id, p.product_name;
+                products p ON oi.product_id = p.product_id;
+
+            -- Materialized: aggregates every order item, so it is only recomputed by refresh_views()
+            CREATE MATERIALIZED VIEW IF NOT EXISTS top_selling_products AS
+            SELECT
+                p.product_id,
+                p.product_name,
+                SUM(oi.quantity) AS total_quantity_sold
+            FROM
+                products p
+            JOIN
+                order_items oi ON p.product_id = oi.product_id
+            GROUP BY
+                p.product_id, p.product_name;
 
             ---
 
             -- 6. Create Indexes for Performance Optimization
             CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email);
             CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id);
+            -- Partial index: only open orders, newest first, for active-order dashboards
+            CREATE INDEX IF NOT EXISTS idx_orders_active ON orders (order_date DESC) WHERE status IN ('Pending', 'Processing');
             CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
-            CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+            -- Covering index: quantity is stored in the index, so SUM(quantity) per product can use an index-only scan
+            DROP INDEX IF EXISTS idx_order_items_product_id;
+            CREATE INDEX IF NOT EXISTS idx_order_items_product_id_q ON order_items (product_id) INCLUDE (quantity);
+            -- The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_top_selling_products_product_id ON top_selling_products (product_id);
+            CREATE INDEX IF NOT EXISTS idx_top_selling_products_quantity ON top_selling_products (total_quantity_sold DESC);
 
-            -- Re-enable client messages to default
-            RESET client_min_messages;
+            ---
+
+            -- 7. Create Stored Functions
+            -- create_order: validates stock, inserts the order and its items, and decrements stock in one call.
+            -- Raises an exception (rolling back the caller's transaction) if a product is missing or understocked.
+            CREATE OR REPLACE FUNCTION create_order(p_customer_id INTEGER, p_product_ids INTEGER[], p_quantities INTEGER[],
+                                                    OUT new_order_id INTEGER, OUT order_total DECIMAL(10, 2))
+            LANGUAGE plpgsql AS $$
+            DECLARE
+                item RECORD;
+            BEGIN
+                -- Lock every product in the cart with a single lookup, in product_id order so concurrent orders cannot deadlock
+                PERFORM 1 FROM products
+                WHERE product_id = ANY (p_product_ids)
+                ORDER BY product_id
+                FOR UPDATE;
+
+                -- Pre-check stock before inserting anything
+                FOR item IN
+                    SELECT x.product_id, x.quantity, p.price, p.stock_quantity
+                    FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+                    LEFT JOIN products p ON p.product_id = x.product_id
+                LOOP
+                    IF item.price IS NULL THEN -- price is NOT NULL, so this means there is no such product
+                        RAISE EXCEPTION 'Product ID % does not exist.', item.product_id;
+                    END IF;
+                    IF item.stock_quantity < item.quantity THEN
+                        RAISE EXCEPTION 'Product ''%'' has insufficient stock. Needed: %, Available: %.',
+                            item.product_id, item.quantity, item.stock_quantity;
+                    END IF;
+                END LOOP;
+
+                -- The order total is aggregated by the INSERT itself
+                INSERT INTO orders (customer_id, total_amount, status)
+                SELECT p_customer_id, COALESCE(SUM(p.price * x.quantity), 0), 'Pending'
+                FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+                JOIN products p ON p.product_id = x.product_id
+                RETURNING order_id, total_amount INTO new_order_id, order_total;
+
+                INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase)
+                SELECT new_order_id, x.product_id, x.quantity, p.price
+                FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+                JOIN products p ON p.product_id = x.product_id;
+
+                -- One UPDATE for the whole cart
+                UPDATE products p
+                SET stock_quantity = p.stock_quantity - x.quantity
+                FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+                WHERE p.product_id = x.product_id;
+            END;
+            $$;
             """
-            self.cursor.execute(ddl_sql)
-            self.conn.commit()
-            print("Database schema (tables, views, indexes) ensured to exist.")
-        except psycopg2.Error as e:
+            # Sent as one multi-statement query, which PostgreSQL runs as a single implicit transaction
+            with self.pool.connection() as conn:
+                conn.execute(ddl_sql)
+            print("Database schema (tables, views, indexes, functions) ensured to exist.")
+        except psycopg.Error as e:
             print(f"Database initialization error: {e}")
-            self.conn.rollback() # Rollback if initialization fails
             raise
 
-    def execute_query(self, sql_query, params=None, fetch_results=True):
+    def execute_query(self, sql_query, params=None, fetch=False, binary=False):
         """
-        Executes an SQL query with optional parameters.
-        Returns results for SELECT queries or a status dict for others.
-        Automatically handles commit for non-SELECTs and rollback on error.
+        Executes an SQL query with optional parameters on a connection checked out from the pool.
+        Returns the result rows when `fetch` is True (SELECTs, `... RETURNING`, `WITH ...` queries),
+        a status dict with the affected row count otherwise, or a dict with an "error" key on failure.
+        Connections are in autocommit mode, so each statement is committed as soon as it succeeds.
+        Parameterized queries are prepared on first use and reused from the
+        connection's prepared-statement cache on later calls.
+        With `binary=True`, results are transferred in PostgreSQL's binary format, which skips
+        text parsing of numeric and timestamp columns on wide result sets.
         """
         try:
-            self.cursor.execute(sql_query, params)
-            if sql_query.strip().upper().startswith("SELECT") and fetch_results:
-                return self.cursor.fetchall()
-            else:
-                self.conn.commit()
-                return {"rows_affected": self.cursor.rowcount}
-        except psycopg2.Error as e:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                # Statements without parameters (ad-hoc or multi-statement SQL) are left unprepared
+                cur.execute(sql_query, params, prepare=True if params else None, binary=binary)
+                if fetch:
+                    return cur.fetchall()
+                return {"rows_affected": cur.rowcount}
+        except psycopg.Error as e:
             print(f"SQL execution error: {e}")
-            self.conn.rollback() # Rollback on error
             return {"error": str(e)}
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            self.conn.rollback()
             return {"error": str(e)}
 
+    def stream_query(self, sql_query, params=None, itersize=1000, binary=False):
+        """
+        Executes a SELECT query through a server-side (named) cursor and yields the result rows,
+        fetching `itersize` rows per round-trip so memory use stays bounded however large the result is.
+        The pooled connection is held until the generator is exhausted or closed.
+        Unlike `execute_query`, database errors are raised rather than returned.
+        """
+        with self.pool.connection() as conn:
+            # Server-side cursors only exist inside a transaction
+            with conn.transaction(), conn.cursor(name=f"srv_{uuid4().hex}") as cur:
+                cur.itersize = itersize
+                cur.execute(sql_query, params, binary=binary)
+                yield from cur
+
     def add_customer(self, first_name, last_name, email, phone=None):
         """Adds a new customer to the database."""
-        sql = "INSERT INTO customers (first_name, last_name, email, phone) VALUES (%s, %s, %s, %s) RETURNING customer_id;"
-        result = self.execute_query(sql, (first_name, last_name, email, phone))
+        result = self.execute_query(self._add_customer_sql, (first_name, last_name, email, phone), fetch=True)
         if isinstance(result, list) and result:
-            print(f"Customer '{first_name} {last_name}' added successfully with ID: {result[0]['customer_id']}")
-            return result[0]['customer_id']
+            print(f"Customer '{first_name} {last_name}' added successfully with ID: {result[0].customer_id}")
+            return result[0].customer_id
         else:
             print(f"Failed to add customer: {result.get('error', 'Unknown error')}")
             return None
@@ -156,131 +321,308 @@ class ECommerceManager:
     def add_product(self, product_name, description, price, stock_quantity):
         """Adds a new product to the database."""
         sql = "INSERT INTO products (product_name, description, price, stock_quantity) VALUES (%s, %s, %s, %s) RETURNING product_id;"
-        result = self.execute_query(sql, (product_name, description, price, stock_quantity))
+        result = self.execute_query(sql, (product_name, description, price, stock_quantity), fetch=True)
         if isinstance(result, list) and result:
-            print(f"Product '{product_name}' added successfully with ID: {result[0]['product_id']}")
-            return result[0]['product_id']
+            print(f"Product '{product_name}' added successfully with ID: {result[0].product_id}")
+            return result[0].product_id
         else:
             print(f"Failed to add product: {result.get('error', 'Unknown error')}")
             return None
 
+    def _copy_rows(self, copy_sql, rows, label):
+        """Streams rows into a table with COPY FROM STDIN. Returns the number of rows loaded, or None on error."""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                row_count = 0
+                with cur.copy(copy_sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        row_count += 1
+            print(f"{row_count} {label} added successfully.")
+            return row_count
+        except psycopg.Error as e:
+            print(f"Failed to bulk add {label}: {e}")
+            return None
+
+    def bulk_add_customers(self, customers):
+        """
+        Adds many customers in one COPY operation, much faster than calling `add_customer` per row.
+        `customers` should be an iterable of tuples: `[(first_name, last_name, email, phone), ...]`.
+        """
+        return self._copy_rows(self._copy_customers_sql, customers, "customers")
+
+    def bulk_add_products(self, products):
+        """
+        Adds many products in one COPY operation, much faster than calling `add_product` per row.
+        `products` should be an iterable of tuples: `[(product_name, description, price, stock_quantity), ...]`.
+        """
+        sql = "COPY products (product_name, description, price, stock_quantity) FROM STDIN;"
+        return self._copy_rows(sql, products, "products")
+
     def create_order(self, customer_id, products_with_quantities):
         """
-        Creates a new order, handling the transaction:
-        1. Inserts the order.
-        2. Inserts order items.
-        3. Updates product stock.
+        Creates a new order by calling the `create_order` stored function, which in one round-trip:
+        1. Checks that every product exists and has enough stock.
+        2. Inserts the order.
+        3. Inserts order items.
+        4. Updates product stock.
         Rolls back if any step fails (e.g., insufficient stock).
         `products_with_quantities` should be a list of tuples: `[(product_id, quantity), ...]`.
+        Quantities are checked and duplicate products merged before the database is contacted.
         """
         try:
-            self.conn.autocommit = False # Start transaction
-
-            total_amount = 0
-            # Pre-check stock and calculate total amount before inserting anything
-            for product_id, quantity in products_with_quantities:
-                # Retrieve product price and current stock
-                product_info = self.execute_query("SELECT price, stock_quantity FROM products WHERE product_id = %s;", (product_id,), fetch_results=True)
-                if not product_info:
-                    raise ValueError(f"Product ID {product_id} does not exist.")
-                product_price = product_info[0]['price']
-                current_stock = product_info[0]['stock_quantity']
-
-                if current_stock < quantity:
-                    raise ValueError(f"Product '{product_id}' has insufficient stock. Needed: {quantity}, Available: {current_stock}.")
-                total_amount += product_price * quantity
-
-            # 1. Insert the new order
-            order_sql = "INSERT INTO orders (customer_id, total_amount, status) VALUES (%s, %s, 'Pending') RETURNING order_id;"
-            order_result = self.execute_query(order_sql, (customer_id, total_amount), fetch_results=True)
-            if not order_result:
-                raise Exception("Failed to create order record.")
-            order_id = order_result[0]['order_id']
-
-            # 2. Insert order items and 3. Update product stock for each item
-            for product_id, quantity in products_with_quantities:
-                # Re-fetch price_at_purchase to ensure it's accurate at the moment of order creation
-                product_info = self.execute_query("SELECT price FROM products WHERE product_id = %s;", (product_id,), fetch_results=True)
-                price_at_purchase = product_info[0]['price']
-
-                item_sql = "INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase) VALUES (%s, %s, %s, %s);"
-                self.execute_query(item_sql, (order_id, product_id, quantity, price_at_purchase), fetch_results=False)
-
-                update_stock_sql = "UPDATE products SET stock_quantity = stock_quantity - %s WHERE product_id = %s;"
-                self.execute_query(update_stock_sql, (quantity, product_id), fetch_results=False)
-
-            self.conn.commit() # Commit transaction if all steps succeed
+            product_ids, quantities = _merge_cart(products_with_quantities)
+
+            # Run the call in an explicit transaction: committed if all steps succeed, rolled back if anything raises.
+            # Pipeline mode sends BEGIN, the call and COMMIT back-to-back, so the whole order costs one
+            # network round-trip; the result is only read once the pipeline has been synced.
+            with self.pool.connection() as conn:
+                with conn.pipeline(), conn.transaction():
+                    cur = conn.execute(self._create_order_sql, (customer_id, product_ids, quantities))
+                order_result = cur.fetchone()
+            order_id = order_result.new_order_id
+            total_amount = order_result.order_total
+
             print(f"Order {order_id} created successfully, Total Amount: {total_amount:.2f}")
             return order_id
 
         except ValueError as ve:
-            self.conn.rollback()
+            # Cart rejected client-side; nothing was sent to the database
             print(f"Failed to create order (Validation Error): {ve}")
             return None
-        except psycopg2.Error as e:
-            self.conn.rollback() # Rollback on database errors
+        except errors.RaiseException as ve:
+            # Stock/product checks raised inside the stored function
+            print(f"Failed to create order (Validation Error): {ve.diag.message_primary}")
+            return None
+        except psycopg.Error as e:
             print(f"Failed to create order (Database Error): {e}")
             return None
         except Exception as e:
-            self.conn.rollback() # Catch other unexpected errors and rollback
             print(f"Failed to create order (Unexpected Error): {e}")
             return None
-        finally:
-            self.conn.autocommit = True # Restore autocommit to default behavior
+
+    def refresh_views(self):
+        """
+        Refreshes the `top_selling_products` materialized view without blocking readers.
+        Reads never refresh it themselves: run this on a schedule, or after a batch of orders,
+        to bound how far the top-selling figures lag behind.
+        """
+        result = self.execute_query(self._refresh_views_sql)
+        if result.get('error'):
+            print(f"Failed to refresh materialized views: {result['error']}")
 
     def get_customer_order_history(self, customer_id):
-        """Queries and prints the order history for a specific customer, using the view."""
-        sql = "SELECT * FROM customer_order_details WHERE customer_id = %s;"
-        results = self.execute_query(sql, (customer_id,))
-        if results and not results.get('error'): # Check for actual results, not just an error dict
-            print(f"\n--- Order History for Customer ID {customer_id} ---")
-            for row in results:
-                order_date_str = row['order_date'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(row['order_date'], datetime) else str(row['order_date'])
-                print(f"  Order ID: {row['order_id']}, Date: {order_date_str}, "
-                      f"Product: {row['product_name']}, Qty: {row['quantity']}, Unit Price: {row['price_at_purchase']:.2f}, "
-                      f"Order Total: {row['total_amount']:.2f}, Status: {row['status']}")
+        """
+        Queries and prints the order history for a specific customer, using the view.
+        Rows are streamed from a server-side cursor, so long histories are never held in memory at once.
+        Returns the number of order items printed, or None on error.
+        """
+        format_line = self._format_order_history_line
+        chunk_size = 1000
+        row_count = 0
+        try:
+            rows = self.stream_query(self._order_history_sql, (customer_id,), itersize=chunk_size, binary=True)
+            # One write per fetched chunk instead of one print() per row
+            while lines := [format_line(row) for row in islice(rows, chunk_size)]:
+                if row_count == 0:
+                    print(f"\n--- Order History for Customer ID {customer_id} ---")
+                sys.stdout.write("".join(lines))
+                row_count += len(lines)
+        except psycopg.Error as e:
+            print(f"Error fetching order history: {e}")
+            return None
+        if row_count:
             print("---------------------------------------")
-        elif results.get('error'):
-            print(f"Error fetching order history: {results['error']}")
         else:
             print(f"No order history found for Customer ID {customer_id}.")
-        return results
+        return row_count
 
     def get_top_selling_products(self, limit=5):
-        """Queries and prints the top-selling products by total quantity sold."""
-        sql = """
-        SELECT
-            p.product_name,
-            SUM(oi.quantity) AS total_quantity_sold
-        FROM
-            products p
-        JOIN
-            order_items oi ON p.product_id = oi.product_id
-        GROUP BY
-            p.product_name
-        ORDER BY
-            total_quantity_sold DESC
-        LIMIT %s;
         """
-        results = self.execute_query(sql, (limit,))
-        if results and not results.get('error'):
+        Queries and prints the top-selling products by total quantity sold, using the materialized view.
+        Reflects orders up to the last `refresh_views()` call.
+        """
+        sql = "SELECT product_name, total_quantity_sold FROM top_selling_products ORDER BY total_quantity_sold DESC LIMIT %s;"
+        results = self.execute_query(sql, (limit,), fetch=True, binary=True)
+        if isinstance(results, list) and results:
             print(f"\n--- Top {limit} Selling Products ---")
             for row in results:
-                print(f"  Product: {row['product_name']}, Total Sold: {row['total_quantity_sold']}")
+                print(f"  Product: {row.product_name}, Total Sold: {row.total_quantity_sold}")
             print("--------------------------")
-        elif results.get('error'):
+        elif isinstance(results, dict):
             print(f"Error fetching top selling products: {results['error']}")
         else:
             print("No product sales data available.")
         return results
 
+    def get_active_orders(self, limit=50):
+        """Queries and prints the most recent orders that are still Pending or Processing."""
+        # The WHERE clause matches the predicate of the partial index idx_orders_active
+        sql = """
+        SELECT order_id, customer_id, order_date, total_amount, status
+        FROM orders
+        WHERE status IN ('Pending', 'Processing')
+        ORDER BY order_date DESC
+        LIMIT %s;
+        """
+        results = self.execute_query(sql, (limit,), fetch=True, binary=True)
+        if isinstance(results, list) and results:
+            print(f"\n--- {len(results)} Most Recent Active Orders ---")
+            for row in results:
+                print(f"  Order ID: {row.order_id}, Customer ID: {row.customer_id}, Date: {_format_order_date(row.order_date)}, "
+                      f"Total: {row.total_amount:.2f}, Status: {row.status}")
+            print("--------------------------")
+        elif isinstance(results, dict):
+            print(f"Error fetching active orders: {results['error']}")
+        else:
+            print("No active orders.")
+        return results
+
     def close(self):
-        """Closes the database connection."""
-        if self.conn:
-            self.cursor.close()
-            self.conn.close()
+        """Closes all connections in the pool."""
+        if self.pool:
+            self.pool.close()
             print("Database connection closed.")
 
+class AsyncECommerceManager:
+    """
+    asyncio counterpart of `ECommerceManager` for concurrent order workloads: a single event loop
+    can keep many queries in flight over the pool instead of blocking one thread per query.
+    Expects the schema to exist already (created by `ECommerceManager` or `schema.sql`).
+
+    Usage:
+        manager = AsyncECommerceManager(**db_config)
+        await manager.open()
+        ...
+        await manager.close()
+    """
+    def __init__(self, dbname, user, password, host="localhost", port="5432", min_connections=2, max_connections=16):
+        self.conn_params = ECommerceManager._conn_params(dbname, user, password, host, port)
+        # Same connection settings as ECommerceManager. Each connection's prepared-statement cache is
+        # an LRU bounded by psycopg's prepared_max, and the pool recycles connections after max_lifetime,
+        # so the cache cannot grow without limit on long-running workers.
+        self.pool = AsyncConnectionPool(
+            kwargs={**self.conn_params, **ECommerceManager._connection_settings},
+            min_size=min_connections,
+            max_size=max_connections,
+            open=False,
+        )
+
+    async def open(self):
+        """Opens the connection pool."""
+        try:
+            # Probe with one direct connection first so connection errors surface immediately (see ECommerceManager._connect)
+            await (await psycopg.AsyncConnection.connect(**self.conn_params)).close()
+            await self.pool.open(wait=True)
+            print("Successfully connected to PostgreSQL database.")
+        except psycopg.Error as e:
+            print(f"Database connection error: {e}")
+            await self.pool.close()
+            raise # Re-raise the exception to indicate connection failure
+
+    async def add_customer(self, first_name, last_name, email, phone=None):
+        """Adds a new customer to the database."""
+        try:
+            async with self.pool.connection() as conn:
+                cur = await conn.execute(ECommerceManager._add_customer_sql, (first_name, last_name, email, phone), prepare=True)
+                customer_id = (await cur.fetchone()).customer_id
+            print(f"Customer '{first_name} {last_name}' added successfully with ID: {customer_id}")
+            return customer_id
+        except psycopg.Error as e:
+            print(f"Failed to add customer: {e}")
+            return None
+
+    async def bulk_add_customers(self, customers):
+        """
+        Adds many customers in one COPY operation.
+        `customers` should be an iterable of tuples: `[(first_name, last_name, email, phone), ...]`.
+        """
+        try:
+            async with self.pool.connection() as conn, conn.cursor() as cur:
+                row_count = 0
+                async with cur.copy(ECommerceManager._copy_customers_sql) as copy:
+                    for row in customers:
+                        await copy.write_row(row)
+                        row_count += 1
+            print(f"{row_count} customers added successfully.")
+            return row_count
+        except psycopg.Error as e:
+            print(f"Failed to bulk add customers: {e}")
+            return None
+
+    async def create_order(self, customer_id, products_with_quantities):
+        """
+        Creates a new order by calling the `create_order` stored function; see `ECommerceManager.create_order`.
+        `products_with_quantities` should be a list of tuples: `[(product_id, quantity), ...]`.
+        """
+        try:
+            product_ids, quantities = _merge_cart(products_with_quantities)
+
+            async with self.pool.connection() as conn:
+                async with conn.pipeline(), conn.transaction():
+                    cur = await conn.execute(ECommerceManager._create_order_sql, (customer_id, product_ids, quantities))
+                order_result = await cur.fetchone()
+            order_id = order_result.new_order_id
+            total_amount = order_result.order_total
+
+            print(f"Order {order_id} created successfully, Total Amount: {total_amount:.2f}")
+            return order_id
+
+        except ValueError as ve:
+            # Cart rejected client-side; nothing was sent to the database
+            print(f"Failed to create order (Validation Error): {ve}")
+            return None
+        except errors.RaiseException as ve:
+            # Stock/product checks raised inside the stored function
+            print(f"Failed to create order (Validation Error): {ve.diag.message_primary}")
+            return None
+        except psycopg.Error as e:
+            print(f"Failed to create order (Database Error): {e}")
+            return None
+        except Exception as e:
+            print(f"Failed to create order (Unexpected Error): {e}")
+            return None
+
+    async def refresh_views(self):
+        """Refreshes the materialized view; see `ECommerceManager.refresh_views`."""
+        try:
+            async with self.pool.connection() as conn:
+                await conn.execute(ECommerceManager._refresh_views_sql)
+        except psycopg.Error as e:
+            print(f"Failed to refresh materialized views: {e}")
+
+    async def get_customer_order_history(self, customer_id):
+        """
+        Queries and prints the order history for a specific customer; see `ECommerceManager.get_customer_order_history`.
+        Returns the number of order items printed, or None on error.
+        """
+        format_line = ECommerceManager._format_order_history_line
+        chunk_size = 1000
+        row_count = 0
+        try:
+            async with self.pool.connection() as conn:
+                # Server-side cursors only exist inside a transaction
+                async with conn.transaction(), conn.cursor(name=f"srv_{uuid4().hex}") as cur:
+                    await cur.execute(ECommerceManager._order_history_sql, (customer_id,), binary=True)
+                    while rows := await cur.fetchmany(chunk_size):
+                        if row_count == 0:
+                            print(f"\n--- Order History for Customer ID {customer_id} ---")
+                        sys.stdout.write("".join(map(format_line, rows)))
+                        row_count += len(rows)
+        except psycopg.Error as e:
+            print(f"Error fetching order history: {e}")
+            return None
+        if row_count:
+            print("---------------------------------------")
+        else:
+            print(f"No order history found for Customer ID {customer_id}.")
+        return row_count
+
+    async def close(self):
+        """Closes all connections in the pool."""
+        await self.pool.close()
+        print("Database connection closed.")
+
 # --- Main Program Entry Point ---
 def main():
     # IMPORTANT: Configure your PostgreSQL connection parameters here
@@ -295,7 +637,7 @@ def main():
 
     try:
         manager = ECommerceManager(**db_config)
-    except psycopg2.Error:
+    except psycopg.Error:
         print("Failed to connect to the database. Please check your database configuration and ensure PostgreSQL service is running.")
         return
 
@@ -337,7 +679,8 @@ def main():
     if customer2_id:
         manager.get_customer_order_history(customer2_id)
 
-    # 5. Query Top Selling Products
+    # 5. Query Top Selling Products (refreshing the materialized view first, as a scheduled job would)
+    manager.refresh_views()
     manager.get_top_selling_products(limit=3)
 
     # 6. Demonstrate direct execution of a complex SQL query
@@ -358,11 +701,11 @@ def main():
     ORDER BY
         total_spent DESC;
     """
-    results = manager.execute_query(complex_query)
-    if results and not results.get('error'):
+    results = manager.execute_query(complex_query, fetch=True)
+    if isinstance(results, list) and results:
         for row in results:
-            print(f"  Customer: {row['first_name']} {row['last_name']}, Orders: {row['total_orders']}, Total Spent: {row['total_spent']:.2f}")
-    elif results.get('error'):
+            print(f"  Customer: {row.first_name} {row.last_name}, Orders: {row.total_orders}, Total Spent: {row.total_spent:.2f}")
+    elif isinstance(results, dict):
         print(f"Error executing custom query: {results['error']}")
 
     # 7. Update Product Stock (example)
@@ -56,6 +56,7 @@ CREATE TABLE IF NOT EXISTS order_items (
 -- 5. Create Views
 -- Views simplify complex queries by creating a virtual table based on the result-set of a SELECT query.
 -- This view provides a detailed overview of every item in every customer's order.
+-- It stays a plain view: lookups for one customer use idx_orders_customer_id and always see the latest orders.
 CREATE OR REPLACE VIEW customer_order_details AS
 SELECT
     c.customer_id,
@@ -75,9 +76,23 @@ JOIN
 JOIN
     order_items oi ON o.order_id = oi.order_id
 JOIN
-    products p ON oi.product_id = p.product_id
-ORDER BY
-    o.order_date DESC, o.order_id, p.product_name;
+    products p ON oi.product_id = p.product_id;
+
+-- This materialized view holds the total quantity sold per product, for top-selling product queries.
+-- It stores the aggregate over every order item, so reads are index scans over pre-aggregated rows.
+-- It is not refreshed on writes or reads: run REFRESH MATERIALIZED VIEW CONCURRENTLY top_selling_products
+-- (the application's refresh_views()) on a schedule to keep it current.
+CREATE MATERIALIZED VIEW IF NOT EXISTS top_selling_products AS
+SELECT
+    p.product_id,
+    p.product_name,
+    SUM(oi.quantity) AS total_quantity_sold
+FROM
+    products p
+JOIN
+    order_items oi ON p.product_id = oi.product_id
+GROUP BY
+    p.product_id, p.product_name;
 
 ---
 
@@ -90,10 +105,78 @@ CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email);
 -- Index on orders.customer_id for faster retrieval of all orders belonging to a specific customer.
 CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id);
 
+-- Partial index on orders that are still open ('Pending' or 'Processing'), newest first.
+-- Dashboards listing active orders only ever read this slice, so the index stays small and cache-resident.
+CREATE INDEX IF NOT EXISTS idx_orders_active ON orders (order_date DESC) WHERE status IN ('Pending', 'Processing');
+
 -- Indexes on order_items.order_id and order_items.product_id for faster joins
 -- and lookups involving order items.
 CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
-CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id);
+-- The product_id index also carries quantity (INCLUDE), so summing quantity sold per product
+-- (top-selling products) can be answered by an index-only scan without visiting the table.
+-- It replaces the earlier plain idx_order_items_product_id index.
+DROP INDEX IF EXISTS idx_order_items_product_id;
+CREATE INDEX IF NOT EXISTS idx_order_items_product_id_q ON order_items (product_id) INCLUDE (quantity);
+
+-- Indexes on the materialized view. The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY;
+-- the other serves top-selling queries ordered by quantity.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_top_selling_products_product_id ON top_selling_products (product_id);
+CREATE INDEX IF NOT EXISTS idx_top_selling_products_quantity ON top_selling_products (total_quantity_sold DESC);
+
+---
+
+-- 7. Create Stored Functions
+-- Stored functions run multi-step business logic server-side, in a single round-trip from the client.
+
+-- create_order: validates stock, inserts the order and its items, and decrements stock in one call.
+-- The cart is passed as two parallel arrays: p_quantities[i] units of product p_product_ids[i].
+-- Raises an exception (rolling back the caller's transaction) if a product is missing or understocked.
+CREATE OR REPLACE FUNCTION create_order(p_customer_id INTEGER, p_product_ids INTEGER[], p_quantities INTEGER[],
+                                        OUT new_order_id INTEGER, OUT order_total DECIMAL(10, 2))
+LANGUAGE plpgsql AS $$
+DECLARE
+    item RECORD;
+BEGIN
+    -- Lock every product in the cart with a single lookup, in product_id order so concurrent orders cannot deadlock
+    PERFORM 1 FROM products
+    WHERE product_id = ANY (p_product_ids)
+    ORDER BY product_id
+    FOR UPDATE;
+
+    -- Pre-check stock before inserting anything
+    FOR item IN
+        SELECT x.product_id, x.quantity, p.price, p.stock_quantity
+        FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+        LEFT JOIN products p ON p.product_id = x.product_id
+    LOOP
+        IF item.price IS NULL THEN -- price is NOT NULL, so this means there is no such product
+            RAISE EXCEPTION 'Product ID % does not exist.', item.product_id;
+        END IF;
+        IF item.stock_quantity < item.quantity THEN
+            RAISE EXCEPTION 'Product ''%'' has insufficient stock. Needed: %, Available: %.',
+                item.product_id, item.quantity, item.stock_quantity;
+        END IF;
+    END LOOP;
+
+    -- The order total is aggregated by the INSERT itself
+    INSERT INTO orders (customer_id, total_amount, status)
+    SELECT p_customer_id, COALESCE(SUM(p.price * x.quantity), 0), 'Pending'
+    FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+    JOIN products p ON p.product_id = x.product_id
+    RETURNING order_id, total_amount INTO new_order_id, order_total;
+
+    INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase)
+    SELECT new_order_id, x.product_id, x.quantity, p.price
+    FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+    JOIN products p ON p.product_id = x.product_id;
+
+    -- One UPDATE for the whole cart
+    UPDATE products p
+    SET stock_quantity = p.stock_quantity - x.quantity
+    FROM unnest(p_product_ids, p_quantities) AS x(product_id, quantity)
+    WHERE p.product_id = x.product_id;
+END;
+$$;
 
 -- Re-enable client messages to default
 RESET client_min_messages;